@@ -2,9 +2,72 @@ import os
 import base64
 
 import betamax
+import lxml.etree
+from betamax import util
+from betamax.matchers import BaseMatcher
 from betamax_serializers import pretty_json
 
-betamax.Betamax.register_serializer(pretty_json.PrettyJSONSerializer)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PrettyJSONSerializer(pretty_json.PrettyJSONSerializer):
+    """
+    Read cassettes with orjson if it is installed. Cassettes are still
+    written by the stock serializer, so recorded files do not change.
+    """
+
+    def deserialize(self, cassette_data):
+        if orjson is None:
+            return super(PrettyJSONSerializer, self).deserialize(cassette_data)
+
+        try:
+            return orjson.loads(cassette_data)
+        except ValueError:
+            return {}
+
+
+betamax.Betamax.register_serializer(PrettyJSONSerializer)
+
+
+def api_call(body):
+    """
+    Return the NetApp API call made by a request body as a (vfiler,
+    canonical XML of the call) tuple, or None if there was none.
+    """
+    if not body:
+        return None
+
+    try:
+        envelope = lxml.etree.fromstring(util.coerce_content(body)
+                                         .encode('utf-8'))
+    except lxml.etree.XMLSyntaxError:
+        return None
+
+    if not len(envelope):
+        return None
+
+    return (envelope.get('vfiler'),
+            lxml.etree.tostring(envelope[0], method='c14n'))
+
+
+class NetAppCallMatcher(BaseMatcher):
+    """
+    Match requests on the API call they make, arguments and vfiler
+    included. All calls to an endpoint share its URI, so without this,
+    replay hands out recorded interactions purely in order, and a
+    cassette recorded for different calls would still replay.
+    """
+    name = 'netapp-call'
+
+    def match(self, request, recorded_request):
+        recorded_request = util.deserialize_prepared_request(recorded_request)
+        return api_call(request.body) == api_call(recorded_request.body)
+
+
+betamax.Betamax.register_request_matcher(NetAppCallMatcher)
 
 netapp_username = os.environ.get('NETAPP_USERNAME', "user-placeholder")
 netapp_password = os.environ.get('NETAPP_PASSWORD', "password-placeholder")
@@ -15,6 +78,15 @@ ontap_hostname = os.environ.get('ONTAP_HOST', 'dbnasa-cluster-mgmt')
 ontap_vserver = os.environ.get('ONTAP_VSERVER', 'vs1rac11')
 
 
+def basic_auth_token(username, password):
+    """
+    Return the base64-encoded username:password string that appears in
+    the HTTP basic auth headers.
+    """
+    credentials = '{0}:{1}'.format(username, password).encode('utf-8')
+    return base64.b64encode(credentials).decode('utf-8')
+
+
 def pytest_addoption(parser):
     parser.addoption("--betamax-record-mode", action="store", default="once",
                      help="Use betamax recording option (once, new_episodes, never)")
@@ -32,22 +104,17 @@ with betamax.Betamax.configure() as config:
     config.default_cassette_options['match_requests_on'] = [
         'method',
         'uri',
+        'netapp-call',
     ]
     config.define_cassette_placeholder('<OCUM-AUTH>',
-                                       base64.b64encode(
-                                           ('{0}:{1}'
-                                            .format(netapp_username,
-                                                    netapp_password)).encode('utf-8'))
-                                       .decode('utf-8'))
+                                       basic_auth_token(netapp_username,
+                                                        netapp_password))
     # Replace the base64-encoded username:password string in the
     # basicauth headers with a placeholder to avoid exposing cleartext
     # passwords in checked-in content.
     config.define_cassette_placeholder('<ONTAP-AUTH>',
-                                       base64.b64encode(
-                                           ('{0}:{1}'
-                                            .format(ontap_username,
-                                                    ontap_password)).encode('utf-8'))
-                                       .decode('utf-8'))
+                                       basic_auth_token(ontap_username,
+                                                        ontap_password))
 
     config.define_cassette_placeholder('<ONTAP-HOST>', ontap_hostname)
     config.define_cassette_placeholder('<NETAPP-HOST>', netapp_hostname)
@@ -43,17 +43,24 @@ enabled::
 """
 
 from datetime import datetime
+import inspect
 import logging
+import threading
+import weakref
 from collections import namedtuple
 from contextlib import contextmanager
+from copy import deepcopy
+from multiprocessing.pool import ThreadPool
+from operator import itemgetter
+from xml.sax.saxutils import quoteattr
 
 import netapp.vocabulary as V
 
 import pytz
 import requests
+from requests.adapters import HTTPAdapter
 import lxml.etree
 import lxml.builder
-import six
 
 X = lxml.builder.ElementMaker()
 
@@ -68,10 +75,17 @@ XMLNS_VERSION = "%d.%d" % (ONTAP_MAJORVERSION, ONTAP_MINORVERSION)
 
 DEFAULT_APP_NAME = "netapp-api-python"
 LOCAL_TIMEZONE = "Europe/Zurich"
+_LOCAL_TZ = pytz.timezone(LOCAL_TIMEZONE)
 
 "The default connection timeout, in seconds"
 DEFAULT_TIMEOUT = 4
 
+"The number of connection pools to cache in the HTTPS adapter"
+POOL_CONNECTIONS = 4
+
+"The maximum number of keep-alive connections to keep in each pool"
+POOL_MAXSIZE = 16
+
 "Only consider these data fields for volumes"
 VOL_FIELDS = [X('volume-id-attributes',
                 *[X(x) for x in
@@ -90,14 +104,91 @@ VOL_FIELDS = [X('volume-id-attributes',
               X('volume-hybrid-cache-attributes', X('caching-policy'))]
 
 
+def _qname(tag):
+    """
+    Helper function: qualify tag with the NetApp namespace, in the Clark
+    notation lxml uses for element tags: ``{namespace}tag``.
+    """
+    return '{%s}%s' % (XMLNS, tag)
+
+
+# Qualified tags looked up on every response (or failure), bound once
+_TAG_RESULTS = _qname('results')
+_TAG_ERROR_CODE = _qname('error-code')
+_TAG_ERROR_MESSAGE = _qname('error-message')
+
+
+"Map the (qualified) tags of an event record's fields to Event attributes"
+_EVENT_FIELDS = {_qname(tag): attribute for tag, attribute in [
+    ('event-about', 'about'),
+    ('event-category', 'category'),
+    ('event-condition', 'condition'),
+    ('event-id', 'id'),
+    ('event-impact-area', 'impact_area'),
+    ('event-impact-level', 'impact_level'),
+    ('event-name', 'name'),
+    ('event-severity', 'severity'),
+    ('event-source-name', 'source_name'),
+    ('event-source-resource-key', 'source_resource_key'),
+    ('event-source-type', 'source_type'),
+    ('event-state', 'state'),
+    ('event-type', 'event_type'),
+    ('event-time', 'timestamp')]}
+_EVENT_ARGUMENTS = _qname('event-arguments')
+
+_NS = {'a': XMLNS}
+
+# XPath expressions evaluated on API responses, compiled once
+_XP_NEXT_TAG = lxml.etree.XPath('/a:netapp/a:results/a:next-tag/text()',
+                                namespaces=_NS)
+_XP_FAILURES = lxml.etree.XPath('/a:netapp/a:results/a:failure-list/*',
+                                namespaces=_NS)
+
+_parsers = threading.local()
+
+_XP_CHILD_CACHE = {}
+
+
+def _child_xpath(string_hierarchy):
+    """
+    Return the compiled XPath object selecting the children at the end
+    of string_hierarchy (a tuple of tag names in the NetApp namespace).
+    Expressions are compiled on first use and cached by the tuple
+    itself, so that they are not rebuilt on every lookup.
+    """
+    try:
+        return _XP_CHILD_CACHE[string_hierarchy]
+    except KeyError:
+        xpath = lxml.etree.XPath("a:" + "/a:".join(string_hierarchy),
+                                 namespaces=_NS)
+        _XP_CHILD_CACHE[string_hierarchy] = xpath
+        return xpath
+
+
+def _response_parser():
+    """
+    Return the XML parser used for API responses, creating it on first
+    use. Responses are machine-generated data, so skip ID collection,
+    whitespace-only text and entity resolution.
+
+    There is one parser per thread, as lxml serialises concurrent use of
+    a parser instance.
+    """
+    try:
+        return _parsers.response
+    except AttributeError:
+        _parsers.response = lxml.etree.XMLParser(collect_ids=False,
+                                                 remove_blank_text=True,
+                                                 huge_tree=True,
+                                                 resolve_entities=False)
+        return _parsers.response
+
+
 def _read_bool(s):
     """
     Helper function to read a Boolean value from NetApp's XML data.
     """
-    if s == "true":
-        return True
-    else:
-        return False
+    return s == "true"
 
 
 def _int_or_none(s):
@@ -136,11 +227,7 @@ def _child_get_strings(parent, *string_hierarchy):
         _child_get_strings(shoes, 'size', 'european')
         => ["42"]
     """
-    string_name = "/a:".join(string_hierarchy)
-
-    query = 'a:%s' % string_name
-    matches = parent.findall(query,
-                             namespaces={'a': XMLNS})
+    matches = _child_xpath(string_hierarchy)(parent)
     return [m.text for m in matches]
 
 
@@ -154,53 +241,88 @@ def _child_get_string(parent, *string_hierarchy):
 
         _child_get_string(parent, "volume-id-attributes", "uuid")
 
-    This function strictly assumes either 1 or 0 matches (empty string)
+    This function strictly assumes either 1 or 0 matches. Returns None
+    if there was no match (or no parent), and the empty string if the
+    match was empty.
+    """
+    if parent is None:
+        return None
+
+    matches = _child_xpath(string_hierarchy)(parent)
+    return (matches[0].text or "") if matches else None
+
+
+def _child_get_element(parent, *string_hierarchy):
     """
-    target = "/a:".join(string_hierarchy)
-    return parent.findtext("a:{}".format(target),
-                           namespaces={'a': XMLNS})
+    Helper function: return the (first) element found by following the
+    given hierarchy from parent, or None if there was none. Use this to
+    look up a subtree once when reading several of its children, e.g::
+
+        space = _child_get_element(parent, "volume-space-attributes")
+        _child_get_int(space, "size-total")
+        _child_get_int(space, "size-used")
+    """
+    matches = _child_xpath(string_hierarchy)(parent)
+    return matches[0] if matches else None
+
+
+def _extract_compression(sis_status_info):
+    """
+    Helper function: read the compression settings out of a
+    <sis-status-info> as a tuple of compression_enabled,
+    inline_compression_enabled.
+    """
+    compression_enabled = _read_bool(_child_get_string(
+        sis_status_info,
+        'is-compression-enabled'))
+
+    inline_enabled = _read_bool(_child_get_string(
+        sis_status_info,
+        'is-inline-compression-enabled'))
+
+    return compression_enabled, inline_enabled
 
 
-def _child_get_kv_dict(parent, string_name):
+def _read_kv_dict(container):
     """
-    Helper function: search a parent for its corresponding key/value
-    dictionary with a given key.
+    Helper function: read the <key-value-pair>:s of an already located
+    container element into a dictionary.
 
     Structure is:
-    <string_name>
+    <container>
       <key-value-pair>
           <key>my-key</key>
           <value>17</value>
       </key-value-pair>
       ...
       <key-value-pair></key-value-pair>
-    </string_name>
+    </container>
 
-    which will return: {'key': 17}
+    which will return: {'my-key': '17'}
     """
     dataset = {}
 
-    xpath_query = 'a:%s/*' % string_name
-    children = parent.xpath(xpath_query,
-                            namespaces={'a': XMLNS})
+    log.debug("Begin parsing children of %s", container.tag)
 
-    log.debug("Begin parsing children of %s" % string_name)
+    for child in container.iterchildren(tag=lxml.etree.Element):
+        if not len(child):
+            # An empty <key-value-pair/> has neither key nor value.
+            log.debug("Skipping empty %s pair", container.tag)
+            continue
 
-    for child in children:
-        key = _child_get_string(child, 'key')
+        # Pairs always list <key> before <value>, so index into them
+        # rather than looking either up by name.
+        key = child[0].text or ""
 
         if len(child) == 1:
             # Reading the documentation, this should never happen.
             # Reading actual logs: this happens.
-            log.debug("Key %s had no corresponding value!" % key)
+            log.debug("Key %s had no corresponding value!", key)
             value = ""
         else:
-            value = _child_get_string(child, 'value')
+            value = child[1].text or ""
 
-        log.debug("Saw {property} pair: {key}: {value}"
-                  .format(property=string_name,
-                          key=key,
-                          value=value))
+        log.debug("Saw %s pair: %s: %s", container.tag, key, value)
 
         dataset[key] = value
 
@@ -209,10 +331,12 @@ def _child_get_kv_dict(parent, string_name):
 
 class Server(object):
     """
-    The Server is a stateless, connectionless configuration container
-    for a netapp monitoring system. There is no need for closing it, but
-    if you want to, a close() function is available to terminate the
-    connection. All API calls are made on event access etc.
+    The Server is a stateless configuration container for a netapp
+    monitoring system. HTTPS connections are kept alive and reused
+    between calls (e.g. when fetching several pages of results). There
+    is no need for closing it, but if you want to, a close() function is
+    available to terminate the connection, and the Server can be used as
+    a context manager. All API calls are made on event access etc.
 
     It implements a subset of the official NetApp API related to events.
 
@@ -239,12 +363,13 @@ class Server(object):
 
             api_call = V.event_iter(V.event_id(str(id)))
 
-            for event in self.server._get_paginated(api_call,
-                                                    endpoint='OCUM',
-                                                    constructor=Event,
-                                                    container_tag="records"):
-                return event
-            else:
+            events = self.server._get_paginated(api_call,
+                                                endpoint='OCUM',
+                                                constructor=Event,
+                                                container_tag="records")
+            try:
+                return next(events)
+            except StopIteration:
                 raise KeyError("No such ID!")
 
         def filter(self, **kwargs):
@@ -270,6 +395,11 @@ class Server(object):
             :param timout: Timeout in seconds, after which the query
              will return an empty results if nothing was found. Defaults
              to 0 if not provided, or if a time interval was provided.
+            :param prefetch: request the next page in the background
+              while the current one is being read (default: True). Pass
+              False if the loop makes API calls of its own through the
+              same Server, or may stop before the end (e.g. with
+              islice()), which would leave a page fetched in vain.
             """
 
             # IA-2144
@@ -280,41 +410,47 @@ class Server(object):
             max_records = kwargs.get('max_records', None)
             timeout = kwargs.get('timeout', 0)
             source = kwargs.get('source', None)
+            prefetch = kwargs.get('prefetch', True)
 
-            api_call = V.event_iter()
+            # Collect the query's children first and build the
+            # event-iter element in one go
+            query = []
 
             if greater_than_id is not None:
-                api_call.append(V.greater_than_id(str(greater_than_id)))
+                query.append(V.greater_than_id(str(greater_than_id)))
 
             if time_range is not None:
                 start_time, end_time = time_range
 
-                api_call.append(
+                query.append(
                     V.time_range(
                         V.event_timestamp_range(
                             V.end_time(end_time),
                             V.start_time(start_time))))
 
             if states is not None:
-                event_states = list(map(V.event_state, states))
-                api_call.append(V.event_state_filter_list(*event_states))
+                event_states = [V.event_state(state) for state in states]
+                query.append(V.event_state_filter_list(*event_states))
 
             # IA-2144 
             #if severities is not None:
             #    obj_statuses = list(map(V.obj_status, severities))
-            #    api_call.append(V.event_severities(*obj_statuses))
+            #    query.append(V.event_severities(*obj_statuses))
 
             if max_records is not None:
-                api_call.append(V.max_records(str(max_records)))
+                query.append(V.max_records(str(max_records)))
 
             if source is not None:
-                api_call.append(V.source(str(source)))
+                query.append(V.source(str(source)))
 
-            api_call.append(V.timeout(str(timeout)))
+            query.append(V.timeout(str(timeout)))
+
+            api_call = V.event_iter(*query)
 
             return self.server._get_paginated(api_call, endpoint='OCUM',
                                               constructor=Event,
-                                              container_tag="records")
+                                              container_tag="records",
+                                              prefetch=prefetch)
 
         def __init__(self, server):
             self.server = server
@@ -333,20 +469,31 @@ class Server(object):
             Return a single volume, raising a IndexError if no volume matched.
             """
             if vserver:
-                volumes = list(self.filter(name=volume_name, vserver=vserver))
+                volumes = self.filter(name=volume_name, vserver=vserver)
             else:
-                volumes = list(self.filter(name=volume_name))
-            return volumes[0]
+                volumes = self.filter(name=volume_name)
+
+            # Stop at the first match rather than fetching every page
+            try:
+                return next(volumes)
+            except StopIteration:
+                raise IndexError(volume_name)
 
-        def make_volume(self, attributes_list):
-            name = _child_get_string(attributes_list,
-                                     'volume-id-attributes',
-                                     'name')
-            vserver = _child_get_string(attributes_list,
-                                        'volume-id-attributes',
-                                        'owning-vserver-name')
+        def make_volume(self, attributes_list, compression_by_path=None):
+            id_attributes = _child_get_element(attributes_list,
+                                               'volume-id-attributes')
+            name = _child_get_string(id_attributes, 'name')
+            vserver = _child_get_string(id_attributes, 'owning-vserver-name')
 
             sis_path = "/vol/{}".format(name)
+
+            if compression_by_path is not None:
+                # Volumes without SIS have no entry, see below.
+                compression, inline = compression_by_path.get(
+                    (vserver, sis_path), (False, False))
+                return Volume(attributes_list, compression=compression,
+                              inline=inline)
+
             sis_api_call = X('sis-get-iter',
                              X('desired-attributes',
                                X('sis-status-info',
@@ -357,21 +504,10 @@ class Server(object):
                                  X('path', sis_path),
                                  X('vserver', vserver))))
 
-            def extract_compression(attributes_list):
-                compression_enabled = _read_bool(_child_get_string(
-                    attributes_list,
-                    'is-compression-enabled'))
-
-                inline_enabled = _read_bool(_child_get_string(
-                    attributes_list,
-                    'is-inline-compression-enabled'))
-
-                return compression_enabled, inline_enabled
-
             result = self.server._get_paginated(
                 api_call=sis_api_call,
                 endpoint='ONTAP',
-                constructor=extract_compression,
+                constructor=_extract_compression,
                 container_tag='attributes-list')
 
             try:
@@ -389,6 +525,31 @@ class Server(object):
             return Volume(attributes_list, compression=compression,
                           inline=inline)
 
+        def _compression_by_path(self):
+            """
+            Return the compression settings of every volume with SIS
+            enabled, as a dictionary mapping (vserver, path) tuples to
+            (compression, inline_compression) tuples.
+            """
+            sis_api_call = X('sis-get-iter',
+                             X('desired-attributes',
+                               X('sis-status-info',
+                                 X('path'),
+                                 X('vserver'),
+                                 X('is-compression-enabled'),
+                                 X('is-inline-compression-enabled'))))
+
+            def unpack_sis_status(sis_status_info):
+                key = (_child_get_string(sis_status_info, 'vserver'),
+                       _child_get_string(sis_status_info, 'path'))
+                return key, _extract_compression(sis_status_info)
+
+            return dict(self.server._get_paginated(
+                api_call=sis_api_call,
+                endpoint='ONTAP',
+                constructor=unpack_sis_status,
+                container_tag='attributes-list'))
+
         def filter(self, max_records=None, **query):
             """
             Usage:
@@ -406,29 +567,53 @@ class Server(object):
             be done automatically under the hood.
             """
 
+            # Copy the static field list rather than rebuilding it.
+            # Appending the VOL_FIELDS elements themselves would move
+            # them out of the query of any listing still in progress.
             api_call = X('volume-get-iter',
                          X('desired-attributes',
                            X('volume-attributes',
-                               *VOL_FIELDS)))
+                               *[deepcopy(field) for field in VOL_FIELDS])))
 
             if max_records is not None:
                 api_call.append(V.max_records(str(max_records)))
 
             if query:
-                attributes = []
-                for attribute, value in six.iteritems(query):
-                    attributes.append(X(attribute.replace('_', '-'), value))
+                attributes = [X(attribute.replace('_', '-'), value)
+                              for attribute, value in query.items()]
 
                 api_call.append(X('query',
                                   X('volume-attributes',
                                     X('volume-id-attributes',
                                       *attributes))))
 
-            return self.server._get_paginated(
-                api_call,
-                endpoint='ONTAP',
-                constructor=self.make_volume,
-                container_tag="attributes-list")
+                # Filtered listings are typically short, so look up
+                # compression for each volume found.
+                return self.server._get_paginated(
+                    api_call,
+                    endpoint='ONTAP',
+                    constructor=self.make_volume,
+                    container_tag="attributes-list")
+
+            return self._all_volumes(api_call)
+
+        def _all_volumes(self, api_call):
+            """
+            Internal helper for unfiltered listings: rather than making
+            one SIS query per volume, read the compression settings of
+            all volumes up front and join them with the listing.
+            """
+            compression_by_path = self._compression_by_path()
+
+            def make_volume(attributes_list):
+                return self.make_volume(attributes_list, compression_by_path)
+
+            for volume in self.server._get_paginated(
+                    api_call,
+                    endpoint='ONTAP',
+                    constructor=make_volume,
+                    container_tag="attributes-list"):
+                yield volume
 
     class ExportPolicy(object):
         """
@@ -437,7 +622,7 @@ class Server(object):
 
         Very internal.
         """
-        name = None
+        __slots__ = ('name', 'server')
 
         def __init__(self, name, server):
             self.name = name
@@ -484,7 +669,7 @@ class Server(object):
                 name=_child_get_string(snapshot_info, 'name'),
                 creation_time=datetime.fromtimestamp(
                     _child_get_int(snapshot_info, 'access-time'),
-                    pytz.timezone(LOCAL_TIMEZONE)),
+                    _LOCAL_TZ),
                 size_kbytes=_child_get_int(snapshot_info, 'total'))
 
         return self._get_paginated(api_call,
@@ -539,7 +724,7 @@ class Server(object):
             constructor=unpack_rule,
             container_tag='attributes-list')
 
-        return sorted(results, key=lambda x: x[0])
+        return sorted(results, key=itemgetter(0))
 
     def locks_on(self, volume_name):
         """
@@ -568,6 +753,53 @@ class Server(object):
                                    constructor=unpack_lock,
                                    container_tag='attributes-list')
 
+    def snapshots_of_many(self, volume_names, workers=8):
+        """
+        Return a dictionary mapping each of the given volume names to
+        the list of its snapshots, as returned by snapshots_of().
+
+        The volumes are queried concurrently by (at most) workers
+        threads, sharing the connections of this Server. There are
+        never more threads than pooled connections (POOL_MAXSIZE).
+        """
+        return self._map_concurrently(self.snapshots_of, volume_names,
+                                      workers)
+
+    def locks_on_many(self, volume_names, workers=8):
+        """
+        Return a dictionary mapping each of the given volume names to
+        the list of locks held on it, as returned by locks_on().
+
+        The volumes are queried concurrently by (at most) workers
+        threads, sharing the connections of this Server. There are
+        never more threads than pooled connections (POOL_MAXSIZE).
+        """
+        return self._map_concurrently(self.locks_on, volume_names, workers)
+
+    def _map_concurrently(self, function, arguments, workers):
+        """
+        Internal helper: call function on each of the arguments from a
+        pool of worker threads, and return a dictionary mapping every
+        argument to the (listed) result of its call.
+
+        The number of workers is capped at POOL_MAXSIZE: any thread
+        beyond that would only wait for a connection to be returned.
+        An exception raised by any of the calls is re-raised here.
+        """
+        arguments = list(arguments)
+        if not arguments:
+            return {}
+
+        pool = ThreadPool(processes=min(workers, POOL_MAXSIZE,
+                                        len(arguments)))
+        try:
+            results = pool.map(lambda argument: list(function(argument)),
+                               arguments)
+        finally:
+            pool.close()
+
+        return dict(zip(arguments, results))
+
     def create_volume(self, name, size_bytes, aggregate_name,
                       junction_path, export_policy_name=None,
                       percentage_snapshot_reserve=0,
@@ -713,6 +945,10 @@ class Server(object):
 
         for i, index_rule in enumerate(remaining_rules, start=1):
             rule_index, _rule = index_rule
+            if rule_index == i:
+                # Already in place, e.g. preceding the removed rule
+                continue
+
             self.perform_call(X('export-rule-set-index',
                                 X('policy-name', policy_name),
                                 X('rule-index', str(rule_index)),
@@ -816,11 +1052,10 @@ class Server(object):
             node_names = _child_get_strings(aggregate_info,
                                             'nodes',
                                             'node-name')
-            bytes_used = int(_child_get_string(aggregate_info,
-                                               'aggr-space-attributes',
-                                               'size-used'))
-            bytes_available = int(_child_get_string(aggregate_info,
-                                                    'aggr-space-attributes',
+            space_attributes = _child_get_element(aggregate_info,
+                                                  'aggr-space-attributes')
+            bytes_used = int(_child_get_string(space_attributes, 'size-used'))
+            bytes_available = int(_child_get_string(space_attributes,
                                                     'size-available'))
             return Aggregate(name=name, node_names=node_names,
                              bytes_used=bytes_used,
@@ -993,13 +1228,9 @@ class Server(object):
             a list of tuples of error_code, message, if any. Empty list
             if not.
         """
-        errors = result.xpath(('/a:netapp/a:results/'
-                               'a:failure-list/*'),
-                              namespaces={'a': XMLNS})
-        for error in errors:
-            code = int(error.find('a:error-code', namespaces={'a': XMLNS}).text)
-            message = error.find('a:error-message',
-                                 namespaces={'a': XMLNS}).text
+        for error in _XP_FAILURES(result):
+            code = int(error.find(_TAG_ERROR_CODE).text)
+            message = error.find(_TAG_ERROR_MESSAGE).text
             yield (code, message)
 
     def raise_on_non_single_answer(self, result):
@@ -1105,10 +1336,56 @@ class Server(object):
         self.ontap_api_url = "https://%s:%d%s" % (hostname,
                                                   port, ONTAP_API_URL)
         self.app_name = app_name
-        self.session = requests.Session()
         self.timeout_s = timeout_s
         self.vfiler = vserver
 
+        # The <netapp> envelope is the same for every call, save for the
+        # vfiler attribute which is added by _render_request().
+        self._envelope_prefix = (
+            "<?xml version='1.0' encoding='UTF-8'?>\n"
+            "<netapp xmlns={} version={} nmsdk_app={}"
+            .format(quoteattr(XMLNS), quoteattr(XMLNS_VERSION),
+                    quoteattr(app_name))
+            .encode('utf-8'))
+
+        self.session = requests.Session()
+        self.session.auth = self.auth_tuple
+        self.session.verify = False
+        self.session.headers.update({'Content-type': 'application/xml'})
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE))
+
+    _instances = weakref.WeakValueDictionary()
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, hostname, username, password, **kwargs):
+        """
+        Return a Server for the given connection details, reusing a
+        live instance (and its open connections) created by an earlier
+        call with the same arguments. Takes the same arguments as
+        `__init__`.
+
+        The returned Server is shared, so changes to its state (e.g.
+        through with_vserver()) are visible to every holder, and closing
+        it closes it for everyone.
+        """
+        # Key on every argument, defaults included, so that leaving out
+        # an argument and passing its default value find the same Server.
+        arguments = inspect.getcallargs(cls.__init__, None, hostname,
+                                        username, password, **kwargs)
+        del arguments['self']
+        key = tuple(sorted(arguments.items()))
+
+        with cls._instances_lock:
+            server = cls._instances.get(key)
+            if server is None:
+                server = cls(hostname, username, password, **kwargs)
+                cls._instances[key] = server
+
+        return server
+
     def close(self):
         """
         Close any open connection to the server. The Server object
@@ -1117,20 +1394,35 @@ class Server(object):
 
         self.session.close()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def _get_paginated(self, api_call, endpoint, constructor,
-                       container_tag="records"):
+                       container_tag="records", prefetch=False):
         """
         Internal convenience wrapper function. Will return a generator
         of objects corresponding to the provided query, as constructed
         by the given constructor. May make several queries if the
         results were paginated.
 
+        Each record is cleared once the constructor has returned, so
+        the constructor must not keep references to the element or
+        its children.
+
+        If prefetch is True, the next page is requested in a background
+        thread while the records of the current page are being
+        consumed. The prefetched request shares the session with the
+        consumer, and abandoning the generator early leaves one page
+        fetched in vain, so only prefetch where the caller can turn it
+        off (see EventLog.filter()).
+
         Raises an APIError if the call failed. Good luck interpreting
         the error message -- it is most likely useless.
         """
 
-        page_left_to_process = True
-
         if endpoint == 'OCUM':
             api_url = self.ocum_api_url
         elif endpoint == 'ONTAP':
@@ -1138,52 +1430,71 @@ class Server(object):
         else:
             raise ValueError(endpoint)
 
+        if container_tag is not None:
+            container_path = "{}/{}".format(_TAG_RESULTS,
+                                            _qname(container_tag))
+
+        tag_element = api_call.find('tag')
+        pool = None
+        next_page = None
         counter = 0
-        while page_left_to_process:
-            counter += 1
-            log.debug("Getting page {}!".format(counter))
-            response = self.perform_call(api_call, api_url)
-            if container_tag is None:
-                return
-
-            num_records = int(
-                response.xpath(('/a:netapp/a:results/'
-                                'a:num-records/text()'),
-                               namespaces={'a': XMLNS})[0])
-
-            records = response.xpath(
-                '/a:netapp/a:results/a:{}/*'
-                .format(container_tag),
-                namespaces={'a': XMLNS})
-
-            assert num_records == len(records)
-
-            for el in records:
-                yield constructor(el)
-
-            next_tag = None
-            potential_next_tag = response.xpath(
-                ('/a:netapp/a:results/'
-                 'a:next-tag/text()'),
-                namespaces={'a': XMLNS})
-            # Is there another page?
-            if not potential_next_tag:
-                break
-
-            # There was
-            next_tag = potential_next_tag[0]
-            next_api_call = api_call
-
-            # According to the specification, we need to preserve
-            # all options, but we also need to replace any previous
-            # occurrences of 'tag'.
-
-            tag_element = next_api_call.find('tag')
-            if tag_element is not None:
-                next_api_call.remove(tag_element)
-
-            next_api_call.append(V.tag(next_tag))
-            api_call = next_api_call
+        try:
+            while True:
+                counter += 1
+                log.debug("Getting page %d!", counter)
+                if next_page is not None:
+                    response = next_page.get()
+                else:
+                    response = self.perform_call(api_call, api_url)
+                if container_tag is None:
+                    return
+
+                container = response.find(container_path)
+                if container is None:
+                    # Empty results come without a container
+                    records = ()
+                else:
+                    log.debug("Got %d records", len(container))
+                    records = container.iterchildren(tag=lxml.etree.Element)
+
+                potential_next_tag = _XP_NEXT_TAG(response)
+
+                # Is there another page?
+                if potential_next_tag:
+                    # There was. According to the specification, we
+                    # need to preserve all options, but we also need to
+                    # replace any previous occurrences of 'tag'.
+                    if tag_element is None:
+                        tag_element = V.tag(potential_next_tag[0])
+                        api_call.append(tag_element)
+                    else:
+                        tag_element.text = potential_next_tag[0]
+
+                    if prefetch:
+                        if pool is None:
+                            pool = ThreadPool(processes=1)
+                        # Render the request here rather than in the
+                        # worker, so that it goes out with the vfiler in
+                        # effect now, not whatever the consumer has
+                        # switched to (e.g. with with_vserver()) by the
+                        # time the worker gets to run.
+                        request = self._render_request(api_call)
+                        next_page = pool.apply_async(
+                            self._post_request, (request, api_url))
+
+                for el in records:
+                    record = constructor(el)
+                    # Release the record's subtree as soon as it has
+                    # been read, rather than holding on to the whole
+                    # page until the next one arrives.
+                    el.clear()
+                    yield record
+
+                if not potential_next_tag:
+                    break
+        finally:
+            if pool is not None:
+                pool.close()
 
     def perform_call(self, api_call, api_url):
         """
@@ -1209,49 +1520,65 @@ class Server(object):
         APIErrors, as the call itself has technically (by NetApp's
         definition) succeeded.
         """
+        return self._post_request(self._render_request(api_call), api_url)
 
-        query_root = V.netapp(api_call,
-                              xmlns=XMLNS,
-                              version=XMLNS_VERSION,
-                              nmsdk_app=self.app_name)
+    def _render_request(self, api_call):
+        """
+        Internal helper: serialise api_call wrapped in the <netapp>
+        envelope, addressed to the vfiler currently in effect.
+        """
         if self.vfiler:
-            query_root.attrib['vfiler'] = self.vfiler
+            envelope = (self._envelope_prefix +
+                        ' vfiler={}>'.format(quoteattr(self.vfiler))
+                        .encode('utf-8'))
+        else:
+            envelope = self._envelope_prefix + b'>'
 
-        request = lxml.etree.tostring(query_root, xml_declaration=True,
-                                      encoding="UTF-8")
+        return envelope + lxml.etree.tostring(api_call) + b'</netapp>'
 
-        print("Performing request: %s" % request)
+    def _post_request(self, request, api_url):
+        """
+        Internal helper: send a request rendered by _render_request()
+        and return the parsed response, as for perform_call().
+        """
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Performing request: %s", request.decode('utf-8'))
+
+        r = self.session.post(api_url, data=request, timeout=self.timeout_s,
+                              stream=True)
+
+        try:
+            # FIXME: prettify this handling
+            r.raise_for_status()
 
-        r = self.session.post(api_url, verify=False, auth=self.auth_tuple,
-                              data=request,
-                              headers={'Content-type': 'application/xml'},
-                              timeout=self.timeout_s)
+            log.debug("Response code: %s", r.status_code)
 
-        # FIXME: prettify this handling
-        r.raise_for_status()
+            # Parse the body as it comes off the socket rather than
+            # buffering all of it first.
+            r.raw.decode_content = True
+            response = lxml.etree.parse(r.raw, _response_parser()).getroot()
+        finally:
+            r.close()
 
-        print("Response code: %s:\n" % r.status_code)
-        print("XML Response: %s: " %
-                  lxml.etree.tostring(lxml.etree.fromstring(r.content),
-                                      pretty_print=True,
-                                      encoding="UTF-8"))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("XML Response: %s",
+                      lxml.etree.tostring(response,
+                                          pretty_print=True,
+                                          encoding="unicode"))
 
         # If we got here, the request was OK. Now for verifying the
         # status...
-        response = lxml.etree.fromstring(r.content)
 
-        status = response.xpath('/a:netapp/a:results/@status',
-                                namespaces={'a': XMLNS})[0]
+        results = response.find(_TAG_RESULTS)
 
-        if status != 'passed':
-            reason = response.xpath('/a:netapp/a:results/@reason',
-                                    namespaces={'a': XMLNS})[0]
-
-            errno = int(response.xpath('/a:netapp/a:results/@errno',
-                                       namespaces={'a': XMLNS})[0])
+        if results.get('status') != 'passed':
+            reason = results.get('reason')
+            errno = int(results.get('errno'))
 
+            # Report the request as sent, envelope (and thus the
+            # vfiler in effect) included.
             raise APIError(message=reason, errno=errno,
-                           failing_query=query_root)
+                           failing_query=lxml.etree.fromstring(request))
 
         return response
 
@@ -1261,70 +1588,62 @@ class Event(object):
     A nicer representation of a logging event. Should only be
     instantiated by the API functions (don't roll your own!).
 
+    :ivar about: A string describing the event further.
+    :ivar category: The category of the event
+    :ivar condition: What condition the event is in
+    :ivar id: The internal ID of the event as given by the logger
+    :ivar impact_area: The event's impact area
+    :ivar impact_level: The event's impact level
+    :ivar name: The event's canonical name
+    :ivar severity: The severity of the event: warning, information,
+      critical, or error
+    :ivar source_name: The name of the resource that produced the event
+    :ivar source_resource_key: The key of the resource that produced the
+      event
+    :ivar source_type: The type of source that produced the event
+    :ivar state: The current state of the event: NEW, OBSOLETE etc
+    :ivar event_type: The type of the event
+    :ivar timestamp: The UNIX timestamp the event was reported (as
+      reported by the API)
+    :ivar arguments: A dictionary representing key-value arguments. May
+      vary between events.
     """
 
-    about = None
-    "A string describing the event further."
-    category = None
-    "The category of the event"
-    condition = None
-    "What condition the event is in"
-    id = None
-    "The internal ID of the event as given by the logger"
-    impact_area = None
-    "The event's impact area"
-    impact_level = None
-    "The event's impact level"
-    name = None
-    "The event's canonical name"
-    severity = None
-    "The severity of the event: warning, information, critical, or error"
-    source_name = None
-    "The name of the resource that produced the event"
-    source_resource_key = None
-    "The key of the resource that produced the event"
-    source_type = None
-    "The type of source that produced the event"
-    state = None
-    "The current state of the event: NEW, OBSOLETE etc"
-    event_type = None
-    "The type of the event"
-
-    datetime = None
-    """A timezone-aware datetime object describing the same date as
-    ``timestamp``"""
-    timestamp = None
-    "The UNIX timestamp the event was reported (as reported by the API)"
-
-    arguments = {}
-    "A dictionary representing key-value arguments. May vary between events."
+    _FIELDS = ('about', 'category', 'condition', 'id', 'impact_area',
+               'impact_level', 'name', 'severity', 'source_name',
+               'source_resource_key', 'source_type', 'state', 'event_type',
+               'timestamp', 'arguments')
+
+    # Events are created in bulk, so do without a per-instance __dict__
+    __slots__ = _FIELDS + ('_datetime',)
 
     def __init__(self, raw_event):
 
-        # FIXME: extract event-arguments as well, if relevant
-        self.about = _child_get_string(raw_event, 'event-about')
-        self.category = _child_get_string(raw_event, 'event-category')
-        self.condition = _child_get_string(raw_event, 'event-condition')
-        self.id = int(_child_get_string(raw_event, 'event-id'))
-        self.impact_area = _child_get_string(raw_event, 'event-impact-area')
-        self.impact_level = _child_get_string(raw_event, 'event-impact-level')
-        self.name = _child_get_string(raw_event, 'event-name')
-        self.severity = _child_get_string(raw_event, 'event-severity')
-        self.source_name = _child_get_string(raw_event, 'event-source-name')
-        self.source_resource_key = _child_get_string(
-            raw_event,
-            'event-source-resource-key')
-        self.source_type = _child_get_string(raw_event, 'event-source-type')
-        self.state = _child_get_string(raw_event, 'event-state')
-        self.event_type = _child_get_string(raw_event, 'event-type')
-
-        unix_timestamp_localtime = int(_child_get_string(raw_event,
-                                                         'event-time'))
-        self.datetime = datetime.fromtimestamp(unix_timestamp_localtime,
-                                               pytz.timezone(LOCAL_TIMEZONE))
-        self.timestamp = unix_timestamp_localtime
-
-        self.arguments = _child_get_kv_dict(raw_event, 'event-arguments')
+        for attribute in self.__slots__:
+            setattr(self, attribute, None)
+
+        self.arguments = {}
+
+        # Read all fields in a single pass over the record's children
+        for child in raw_event:
+            attribute = _EVENT_FIELDS.get(child.tag)
+            if attribute is not None:
+                setattr(self, attribute, child.text or "")
+            elif child.tag == _EVENT_ARGUMENTS:
+                self.arguments = _read_kv_dict(child)
+
+        self.id = int(self.id)
+        self.timestamp = int(self.timestamp)
+
+    @property
+    def datetime(self):
+        """
+        A timezone-aware datetime object describing the same date as
+        ``timestamp``. Only computed when first accessed.
+        """
+        if self._datetime is None:
+            self._datetime = datetime.fromtimestamp(self.timestamp, _LOCAL_TZ)
+        return self._datetime
 
     def __str__(self):
         datestring = "{:%c}"
@@ -1334,7 +1653,8 @@ class Event(object):
 
     def __eq__(self, other):
         return(isinstance(other, self.__class__)
-               and self.__dict__ == other.__dict__)
+               and all(getattr(self, attribute) == getattr(other, attribute)
+                       for attribute in self._FIELDS))
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -1347,73 +1667,62 @@ class Volume(object):
     Do not roll your own.
     """
 
+    __slots__ = ('compression_enabled', 'inline_compression', 'uuid', 'name',
+                 'active_policy_name', 'size_total_bytes', 'size_used_bytes',
+                 'state', 'junction_path', 'containing_aggregate_name',
+                 'node_name', 'autosize_enabled', 'max_autosize',
+                 'owning_vserver_name', 'creation_time',
+                 'percentage_snapshot_reserve',
+                 'percentage_snapshot_reserve_used', 'caching_policy')
+
     def __init__(self, raw_object, compression, inline):
         self.compression_enabled = compression
         self.inline_compression = inline
-        self.uuid = _child_get_string(raw_object,
-                                      'volume-id-attributes',
-                                      'uuid')
-        self.name = _child_get_string(raw_object,
-                                      'volume-id-attributes',
-                                      'name')
+
+        # Look up each subtree that is read more than once only once
+        id_attributes = _child_get_element(raw_object,
+                                           'volume-id-attributes')
+        space_attributes = _child_get_element(raw_object,
+                                              'volume-space-attributes')
+        autosize_attributes = _child_get_element(raw_object,
+                                                 'volume-autosize-attributes')
+
+        self.uuid = _child_get_string(id_attributes, 'uuid')
+        self.name = _child_get_string(id_attributes, 'name')
         self.active_policy_name = _child_get_string(raw_object,
                                                     'volume-export-attributes',
                                                     'policy')
-        self.size_total_bytes = _child_get_int(
-            raw_object,
-            'volume-space-attributes',
-            'size-total')
-        self.size_used_bytes = _child_get_int(
-            raw_object,
-            'volume-space-attributes',
-            'size-used')
+        self.size_total_bytes = _child_get_int(space_attributes, 'size-total')
+        self.size_used_bytes = _child_get_int(space_attributes, 'size-used')
         self.state = _child_get_string(raw_object,
                                        'volume-state-attributes',
                                        'state')
-        self.junction_path = _child_get_string(raw_object,
-                                               'volume-id-attributes',
-                                               'junction-path')
+        self.junction_path = _child_get_string(id_attributes, 'junction-path')
         self.containing_aggregate_name = _child_get_string(
-            raw_object,
-            'volume-id-attributes',
-            'containing-aggregate-name')
-        self.node_name = _child_get_string(raw_object,
-                                           'volume-id-attributes',
-                                           'node')
+            id_attributes, 'containing-aggregate-name')
+        self.node_name = _child_get_string(id_attributes, 'node')
 
         self.autosize_enabled = _read_bool(
-            _child_get_string(raw_object,
-                              'volume-autosize-attributes',
-                              'is-enabled'))
+            _child_get_string(autosize_attributes, 'is-enabled'))
 
         self.max_autosize = _int_or_none(_child_get_string(
-            raw_object,
-            'volume-autosize-attributes',
-            'maximum-size'))
-        self.owning_vserver_name = _child_get_string(raw_object,
-                                                     'volume-id-attributes',
+            autosize_attributes, 'maximum-size'))
+        self.owning_vserver_name = _child_get_string(id_attributes,
                                                      'owning-vserver-name')
-        creation_timestamp = _child_get_int(raw_object,
-                                            'volume-id-attributes',
-                                            'creation-time')
+        creation_timestamp = _child_get_int(id_attributes, 'creation-time')
         try:
-            self.creation_time = datetime.fromtimestamp(
-                creation_timestamp,
-                pytz.timezone(LOCAL_TIMEZONE))
+            self.creation_time = datetime.fromtimestamp(creation_timestamp,
+                                                        _LOCAL_TZ)
         except TypeError:
             log.info("Volume {} had no valid creation time!"
                      .format(self.name))
             self.creation_time = None
 
         self.percentage_snapshot_reserve = _child_get_int(
-            raw_object,
-            'volume-space-attributes',
-            'percentage-snapshot-reserve')
+            space_attributes, 'percentage-snapshot-reserve')
 
         self.percentage_snapshot_reserve_used = _child_get_int(
-            raw_object,
-            'volume-space-attributes',
-            'percentage-snapshot-reserve-used')
+            space_attributes, 'percentage-snapshot-reserve-used')
 
         self.caching_policy = _child_get_string(
             raw_object,
@@ -1421,11 +1730,14 @@ class Volume(object):
             'caching-policy')
 
     def __str__(self):
-        return str("Volume{}".format(self.__dict__))
+        fields = dict((attribute, getattr(self, attribute))
+                      for attribute in self.__slots__)
+        return str("Volume{}".format(fields))
 
     def __eq__(self, other):
         return(isinstance(other, self.__class__)
-               and self.__dict__ == other.__dict__)
+               and all(getattr(self, attribute) == getattr(other, attribute)
+                       for attribute in self.__slots__))
 
     def __ne__(self, other):
         return not self.__eq__(other)
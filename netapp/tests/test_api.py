@@ -4,6 +4,7 @@
 # or submit itself to any jurisdiction.
 import netapp.api
 
+import io
 import os
 import re
 from contextlib import contextmanager
@@ -15,6 +16,7 @@ import pytest
 import betamax
 import pytz
 import requests
+import lxml.etree
 
 
 requests.packages.urllib3.disable_warnings()
@@ -22,6 +24,18 @@ log = logging.getLogger(__name__)
 MAX_EVENTS = 100
 
 
+def assert_cassette_replayed(recorder):
+    """
+    Assert that every interaction of the cassette in use was replayed,
+    i.e. that the code under test made exactly the recorded calls.
+    """
+    cassette = recorder.current_cassette
+    if not cassette.is_recording():
+        unused = [i for i in cassette.interactions if not i.used]
+        assert not unused, "{} recorded interactions not replayed".format(
+            len(unused))
+
+
 def policy_by_name(policies_gen, policy_name):
     for policy in policies_gen:
         if not policy.name == policy_name:
@@ -121,7 +135,8 @@ def test_list_events_after(ocum_server):
 
     found_anything = False
     with recorder.use_cassette('list_events_after'):
-        for event in islice(server.events.filter(greater_than_id=0),
+        for event in islice(server.events.filter(greater_than_id=0,
+                                                 prefetch=False),
                             MAX_EVENTS):
             found_anything = True
             assert event
@@ -181,7 +196,8 @@ def test_severity_warning_only_warnings(ocum_server):
     recorder, server = ocum_server
 
     with recorder.use_cassette('only_warning'):
-        for event in islice(server.events.filter(severities=['warning']),
+        for event in islice(server.events.filter(severities=['warning'],
+                                                 prefetch=False),
                             MAX_EVENTS):
             assert event.severity == 'warning'
 
@@ -199,7 +215,7 @@ def test_get_known_event_id(ocum_server):
     recorder, server = ocum_server
 
     with recorder.use_cassette('known_event_id'):
-        for event in server.events:
+        for event in server.events.filter(prefetch=False):
             known_event = event
             break
 
@@ -533,6 +549,8 @@ def test_remove_export_rule(ontap_server):
         with server.with_vserver(ONTAP_VSERVER):
             server.delete_export_policy(policy_name=policy_name)
 
+        assert_cassette_replayed(recorder)
+
 
 @pytest.mark.xfail(reason="Requires license")
 def test_rollback_from_snapshot(ontap_server):
@@ -729,10 +747,17 @@ def test_break_locks_nonexistent(ontap_server):
 def test_volume_read_compression_status(ontap_server):
     recorder, server = ontap_server
     with recorder.use_cassette('read_compression_status'):
-        for volume in server.volumes:
-            assert hasattr(volume, 'compression_enabled')
-            assert hasattr(volume, 'inline_compression')
-            return
+        volumes = list(islice(server.volumes, 10))
+        assert volumes
+
+        # The listing joins one bulk SIS query onto the volumes; it must
+        # agree with asking for each volume's SIS status on its own.
+        for volume in volumes:
+            single = server.volumes.single(volume.name,
+                                           vserver=volume.owning_vserver_name)
+            assert ((volume.compression_enabled, volume.inline_compression)
+                    == (single.compression_enabled,
+                        single.inline_compression))
 
 
 def test_volume_set_get_compression_status(ontap_server):
@@ -855,3 +880,265 @@ def test_create_policy_with_invalid_rules_not_created(ontap_server):
             with pytest.raises(netapp.api.APIError):
                 server.create_export_policy(policy_name, rules=invalid_rules)
             assert policy_name not in server.export_policies
+
+
+def test_get_reuses_live_server():
+    server = netapp.api.Server.get(hostname="netapp-1234", username="admin",
+                                   password="admin123", timeout_s=10)
+
+    assert netapp.api.Server.get(hostname="netapp-1234", username="admin",
+                                 password="admin123", timeout_s=10) is server
+    assert netapp.api.Server.get(hostname="netapp-1234", username="admin",
+                                 password="admin456",
+                                 timeout_s=10) is not server
+
+
+def test_get_reuses_server_regardless_of_spelled_out_defaults():
+    server = netapp.api.Server.get("netapp-1234", "admin", "admin123")
+
+    assert netapp.api.Server.get("netapp-1234", "admin", "admin123",
+                                 port=443) is server
+    assert netapp.api.Server.get(
+        hostname="netapp-1234", username="admin", password="admin123",
+        timeout_s=netapp.api.DEFAULT_TIMEOUT, vserver="") is server
+    assert netapp.api.Server.get("netapp-1234", "admin", "admin123",
+                                 port=8443) is not server
+
+
+class StubResponse(object):
+    """
+    A successful HTTP response with a canned body, as handed out by
+    StubSession.
+    """
+    status_code = 200
+
+    def __init__(self, body):
+        self.raw = io.BytesIO(body)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StubSession(object):
+    """
+    Stands in for a Server's requests.Session: records the body of
+    every request and answers with respond(body), the XML to put
+    inside <results>.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+
+    def post(self, url, data, **kwargs):
+        self.requests.append(data)
+        return StubResponse(
+            ('<netapp xmlns="{}" version="1.21">'
+             '<results status="passed">{}</results></netapp>'
+             .format(netapp.api.XMLNS, self.respond(data)))
+            .encode('utf-8'))
+
+
+def stub_server(respond):
+    server = netapp.api.Server(hostname="netapp-1234", username="admin",
+                               password="admin123")
+    server.session = StubSession(respond)
+    return server
+
+
+def event_records(*ids):
+    return ('<records>{}</records>'
+            .format(''.join('<event-info><event-id>{}</event-id>'
+                            '<event-time>1470045486</event-time>'
+                            '</event-info>'.format(i) for i in ids)))
+
+
+def test_prefetched_page_keeps_vfiler_of_its_request():
+    def respond(body):
+        if b'<tag>' not in body:
+            return event_records(1) + '<next-tag>page-2</next-tag>'
+        return event_records(2)
+
+    server = stub_server(respond)
+    events = server.events.filter()
+
+    # Page 2 is requested while page 1 is being consumed, but switching
+    # vserver in the loop body must not redirect it.
+    assert next(events).id == 1
+    with server.with_vserver('vsX'):
+        assert [event.id for event in events] == [2]
+
+    page_2 = server.session.requests[1]
+    assert b'<tag>page-2</tag>' in page_2
+    assert b'vfiler' not in page_2
+
+
+def volume_record(name, vserver):
+    return ('<volume-attributes><volume-id-attributes>'
+            '<name>{}</name><owning-vserver-name>{}</owning-vserver-name>'
+            '</volume-id-attributes></volume-attributes>'
+            .format(name, vserver))
+
+
+def sis_record(path, vserver, compression, inline):
+    return ('<sis-status-info><path>{}</path><vserver>{}</vserver>'
+            '<is-compression-enabled>{}</is-compression-enabled>'
+            '<is-inline-compression-enabled>{}'
+            '</is-inline-compression-enabled></sis-status-info>'
+            .format(path, vserver, compression, inline))
+
+
+def test_volume_listing_joins_compression_on_vserver_and_path():
+    def respond(body):
+        if b'<volume-get-iter>' in body:
+            return ('<attributes-list>{}</attributes-list>'
+                    .format(volume_record('a', 'vs1')
+                            + volume_record('b', 'vs1')
+                            + volume_record('c', 'vs2')))
+        return ('<attributes-list>{}</attributes-list>'
+                .format(sis_record('/vol/a', 'vs1', 'true', 'false')
+                        + sis_record('/vol/c', 'vs1', 'true', 'true')))
+
+    server = stub_server(respond)
+    volumes = {volume.name: (volume.compression_enabled,
+                             volume.inline_compression)
+               for volume in server.volumes}
+
+    # b has no SIS entry, and c's entry belongs to another vserver:
+    # both fall back to no compression.
+    assert volumes == {'a': (True, False),
+                       'b': (False, False),
+                       'c': (False, False)}
+
+    assert len([body for body in server.session.requests
+                if b'<sis-get-iter>' in body]) == 1
+
+
+def test_remove_export_rule_only_moves_rules_out_of_place():
+    def respond(body):
+        if b'<export-rule-get-iter>' in body:
+            # Rule 2 was just removed
+            return ('<attributes-list>{}</attributes-list>'
+                    .format(''.join('<export-rule-info>'
+                                    '<rule-index>{}</rule-index>'
+                                    '<client-match>10.0.0.{}</client-match>'
+                                    '</export-rule-info>'.format(i, i)
+                                    for i in (1, 3, 4))))
+        return ''
+
+    server = stub_server(respond)
+    server.remove_export_rule("my-policy", 2)
+
+    set_index = [body for body in server.session.requests
+                 if b'<export-rule-set-index>' in body]
+
+    assert len(set_index) == 2
+    assert b'<rule-index>3</rule-index>' in set_index[0]
+    assert b'<new-rule-index>2</new-rule-index>' in set_index[0]
+    assert b'<rule-index>4</rule-index>' in set_index[1]
+    assert b'<new-rule-index>3</new-rule-index>' in set_index[1]
+
+
+def test_read_kv_dict_skips_empty_pairs():
+    container = lxml.etree.fromstring(
+        '<environment><key-value-pair/>'
+        '<key-value-pair><key>a</key><value>1</value></key-value-pair>'
+        '<key-value-pair><key>b</key></key-value-pair></environment>')
+
+    assert netapp.api._read_kv_dict(container) == {'a': '1', 'b': ''}
+
+
+def volume_in(body):
+    return re.search(br'<volume>([^<]*)</volume>', body).group(1).decode()
+
+
+def test_snapshots_and_locks_of_many_map_each_volume():
+    def respond(body):
+        volume = volume_in(body)
+        if b'<snapshot-get-iter>' in body:
+            return ('<attributes-list><snapshot-info><name>{}-snap</name>'
+                    '<access-time>1470045486</access-time><total>8</total>'
+                    '</snapshot-info></attributes-list>'.format(volume))
+        if volume == 'vol-2':
+            return ('<attributes-list><lock-info><volume>vol-2</volume>'
+                    '<lock-state>granted</lock-state>'
+                    '<client-address>10.0.0.1</client-address>'
+                    '</lock-info></attributes-list>')
+        return ''
+
+    server = stub_server(respond)
+    volume_names = ['vol-{}'.format(i) for i in range(20)]
+
+    snapshots = server.snapshots_of_many(volume_names, workers=32)
+    assert sorted(snapshots) == sorted(volume_names)
+    for volume_name, volume_snapshots in snapshots.items():
+        assert [s.name for s in volume_snapshots] == [volume_name + '-snap']
+
+    locks = server.locks_on_many(['vol-1', 'vol-2'])
+    assert locks == {'vol-1': [],
+                     'vol-2': [netapp.api.Lock(volume='vol-2',
+                                               state='granted',
+                                               client_address='10.0.0.1')]}
+
+
+def test_many_of_no_volumes_makes_no_requests():
+    server = stub_server(lambda body: '')
+
+    assert server.snapshots_of_many([]) == {}
+    assert server.locks_on_many(iter([])) == {}
+    assert server.session.requests == []
+
+
+def test_many_raises_failure_of_any_worker():
+    def respond(body):
+        if volume_in(body) == 'vol-bad':
+            raise requests.exceptions.ConnectionError("Connection reset")
+        return ''
+
+    server = stub_server(respond)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        server.locks_on_many(['vol-1', 'vol-bad', 'vol-3'])
+
+
+class FailingSession(StubSession):
+    """
+    A StubSession answering every request with an API failure.
+    """
+
+    def post(self, url, data, **kwargs):
+        self.requests.append(data)
+        return StubResponse(
+            ('<netapp xmlns="{}" version="1.21">'
+             '<results status="failed" errno="13001" reason="Bad thing"/>'
+             '</netapp>'.format(netapp.api.XMLNS))
+            .encode('utf-8'))
+
+
+def test_api_error_reports_vfiler_of_failing_request():
+    server = stub_server(lambda body: '')
+    server.session = FailingSession(None)
+
+    with pytest.raises(netapp.api.APIError) as excinfo:
+        with server.with_vserver('vsX'):
+            server.destroy_volume('my-volume')
+
+    assert b'vfiler="vsX"' in excinfo.value.failing_query
+    assert b'<volume-destroy>' in excinfo.value.failing_query
+
+
+def test_events_filter_without_prefetch_waits_for_next_page():
+    def respond(body):
+        if b'<tag>' not in body:
+            return event_records(1) + '<next-tag>page-2</next-tag>'
+        return event_records(2)
+
+    server = stub_server(respond)
+    events = server.events.filter(prefetch=False)
+
+    assert next(events).id == 1
+    assert len(server.session.requests) == 1
+    assert [event.id for event in events] == [2]